@@ -39,28 +39,26 @@ class Extractor:
                     exclude_unconnected_nodes=False):
         """Read a csv, perform callbacks to retrieve node and edge info per row.
         Assumes that all of the properties extractable for a node occur on the line with the node identifier"""
-        skipped_header = False
-        for i, line in enumerate(infile, start=1):
-        
-            if comment_character is not None and line.startswith(comment_character):
-                continue
+        # feed a single csv reader the whole file, filtering out comment lines on the way in -
+        # the reader splits rows in C, so avoid constructing a new reader per line
+        if comment_character is not None:
+            line_iterator = (line for line in infile if not line.startswith(comment_character))
+        else:
+            line_iterator = infile
+        csv_reader = csv.reader(line_iterator, delimiter=delim)
+        if has_header_row:
+            next(csv_reader, None)
 
-            if has_header_row and not skipped_header:
-                skipped_header = True
+        for split_row in csv_reader:
+
+            if not split_row:
                 continue
 
-            if filter_field is not None:
-                filter_field_value = line[:-1].split(delim)[filter_field]
-                if filter_field_value not in filter_set:
-                    continue
+            if filter_field is not None and split_row[filter_field] not in filter_set:
+                continue
 
             self.load_metadata['record_counter'] += 1
             try:
-                # TODO we should pass the whole file iterator to csv reader, just need to handle comments and headers
-                # CSV Reader expects a list of rows as input and outputs a list of strings.
-                # We process one at a time, so we pass "line" in as a list and take the first result.
-                reader = csv.reader([line], delimiter=delim)
-                split_row = list(reader)[0]
                 self.parse_row(split_row, subject_extractor, object_extractor, predicate_extractor, subject_property_extractor, object_property_extractor, edge_property_extractor, exclude_unconnected_nodes)
             except Exception as e:
                 self.load_metadata['errors'].append(e.__str__())
@@ -1,5 +1,5 @@
 import os
-import jsonlines
+import orjson
 import logging
 
 from Common.utils import LoggingUtil
@@ -14,6 +14,13 @@ class KGXFileWriter:
                                       line_format='medium',
                                       level=logging.DEBUG,
                                       log_file_path=os.environ['DATA_SERVICES_LOGS'])
+
+    # use a large (4 MB) write buffer - output files can grow to many GB and the
+    # writers emit one small write per node or edge, so the default 8 KB buffer
+    # would flush to the OS far more often than necessary
+    # (files are opened in binary mode and lines serialized to utf-8 bytes with
+    # orjson, avoiding the per-write encode a TextIOWrapper would do)
+    output_file_buffer_size = 4 * 1024 * 1024
     """
     constructor
     :param nodes_output_file_path: the file path for the nodes file
@@ -36,16 +43,14 @@ class KGXFileWriter:
             if os.path.isfile(nodes_output_file_path):
                 # TODO verify - do we really want to overwrite existing files? we could remove them on previous errors instead
                 self.logger.warning(f'KGXFileWriter warning.. file already existed: {nodes_output_file_path}! Overwriting it!')
-            self.nodes_output_file_handler = open(nodes_output_file_path, 'w')
-            self.nodes_jsonl_writer = jsonlines.Writer(self.nodes_output_file_handler)
+            self.nodes_output_file_handler = open(nodes_output_file_path, 'wb', buffering=self.output_file_buffer_size)
 
         self.edges_output_file_handler = None
         if edges_output_file_path:
             if os.path.isfile(edges_output_file_path):
                 # TODO verify - do we really want to overwrite existing files? we could remove them on previous errors instead
                 self.logger.warning(f'KGXFileWriter warning.. file already existed: {edges_output_file_path}! Overwriting it!')
-            self.edges_output_file_handler = open(edges_output_file_path, 'w')
-            self.edges_jsonl_writer = jsonlines.Writer(self.edges_output_file_handler)
+            self.edges_output_file_handler = open(edges_output_file_path, 'wb', buffering=self.output_file_buffer_size)
 
     def __enter__(self):
         return self
@@ -55,11 +60,9 @@ class KGXFileWriter:
 
     def close(self):
         if self.nodes_output_file_handler:
-            self.nodes_jsonl_writer.close()
             self.nodes_output_file_handler.close()
             self.nodes_output_file_handler = None
         if self.edges_output_file_handler:
-            self.edges_jsonl_writer.close()
             self.edges_output_file_handler.close()
             self.edges_output_file_handler = None
 
@@ -100,10 +103,10 @@ class KGXFileWriter:
 
     def __write_node_to_file(self, node):
         try:
-            self.nodes_jsonl_writer.write(node)
+            self.nodes_output_file_handler.write(orjson.dumps(node) + b'\n')
             self.nodes_written += 1
-        except jsonlines.InvalidLineError as e:
-            self.logger.error(f'KGXFileWriter: Failed to write json data: {e.line}.')
+        except TypeError as e:
+            self.logger.error(f'KGXFileWriter: Failed to write json data: {node}.')
             raise e
 
     def write_edge(self,
@@ -149,8 +152,8 @@ class KGXFileWriter:
 
     def __write_edge_to_file(self, edge):
         try:
-            self.edges_jsonl_writer.write(edge)
+            self.edges_output_file_handler.write(orjson.dumps(edge) + b'\n')
             self.edges_written += 1
-        except jsonlines.InvalidLineError as e:
-            self.logger.error(f'KGXFileWriter: Failed to write json data: {e.line}.')
+        except TypeError as e:
+            self.logger.error(f'KGXFileWriter: Failed to write json data: {edge}.')
             raise e
@@ -192,17 +192,20 @@ class MemoryGraphMerger(GraphMerger):
     # merge a list of edges (dictionaries not kgxedge objects!) into the existing list
     def merge_edges(self, edges):
         edge_count = 0
+        # bind the hot loop lookups to local names - this runs once per edge in the graph
+        get_edge_key = edge_key_function
+        stored_edges = self.edges
         for edge in edges:
             edge_count += 1
-            edge_key = edge_key_function(edge)
-            if edge_key in self.edges:
+            edge_key = get_edge_key(edge)
+            if edge_key in stored_edges:
                 self.merged_edge_counter += 1
-                merged_edge = entity_merging_function(quick_json_loads(self.edges[edge_key]),
+                merged_edge = entity_merging_function(quick_json_loads(stored_edges[edge_key]),
                                                       edge,
                                                       EDGE_PROPERTIES_THAT_SHOULD_BE_SETS)
-                self.edges[edge_key] = quick_json_dumps(merged_edge)
+                stored_edges[edge_key] = quick_json_dumps(merged_edge)
             else:
-                self.edges[edge_key] = quick_json_dumps(edge)
+                stored_edges[edge_key] = quick_json_dumps(edge)
         return edge_count
 
     def get_merged_nodes_jsonl(self):
@@ -1,10 +1,14 @@
 import os
 import logging
+import orjson
 import requests
+import sqlite3
+
+from concurrent.futures import ThreadPoolExecutor
 
 from robokop_genetics.genetics_normalization import GeneticsNormalizer
 from Common.node_types import *
-from Common.utils import LoggingUtil
+from Common.utils import LoggingUtil, chunk_iterator, quick_json_dumps, quick_json_loads
 
 NORMALIZATION_CODE_VERSION = '1.0'
 
@@ -24,6 +28,9 @@ class NodeNormalizer:
 
     DEFAULT_NODE_NORMALIZATION_ENDPOINT = 'https://nodenormalization-sri.renci.org/'
 
+    # number of normalization chunks requested concurrently - the requests are I/O bound
+    NODE_NORMALIZATION_PARALLEL_REQUESTS = 8
+
     def __init__(self,
                  log_level=logging.INFO,
                  node_normalization_version: str = 'latest',
@@ -60,6 +67,21 @@ class NodeNormalizer:
         else:
             self.node_norm_endpoint = self.DEFAULT_NODE_NORMALIZATION_ENDPOINT
 
+        # one session for all node norm requests - reuses the connection instead of
+        # doing a TCP/TLS handshake for every chunk and asks for compressed responses
+        self.node_norm_session = requests.Session()
+        self.node_norm_session.headers.update({'Accept-Encoding': 'gzip'})
+
+        # optionally memoize normalization responses on disk so that subsequent runs
+        # skip the service calls for curies that were already normalized
+        self.norm_cache_db = None
+        norm_cache_path = os.environ.get('NODE_NORMALIZATION_CACHE_PATH')
+        if norm_cache_path:
+            self.norm_cache_db = sqlite3.connect(norm_cache_path)
+            self.norm_cache_db.execute('CREATE TABLE IF NOT EXISTS node_norms '
+                                       '(curie TEXT, conflated INTEGER, response TEXT, '
+                                       'PRIMARY KEY (curie, conflated))')
+
         self.sequence_variant_normalizer = None
         self.variant_node_types = None
 
@@ -79,69 +101,38 @@ class NodeNormalizer:
         # init the cache list - this accumulates all of the results from the node norm service
         cached_node_norms: dict = {}
 
-        # save the node list count to avoid grabbing it over and over
-        node_count: int = len(node_list)
-
         # create a unique set of node ids
         tmp_normalize: set = set([node['id'] for node in node_list])
 
         # convert the set to a list so we can iterate through it
         to_normalize: list = list(tmp_normalize)
 
-        # init the array index lower boundary
-        start_index: int = 0
-
-        # get the last index of the list
-        last_index: int = len(to_normalize)
-
-        self.logger.debug(f'{last_index} unique nodes found in this group.')
-
-        # grab chunks of the data frame
-        while True:
-            if start_index < last_index:
-                # define the end index of the slice
-                end_index: int = start_index + block_size
-
-                # force the end index to be the last index to insure no overflow
-                if end_index >= last_index:
-                    end_index = last_index
-
-                self.logger.debug(f'Working block {start_index} to {end_index}.')
-
-                # collect a slice of records from the data frame
-                data_chunk: list = to_normalize[start_index: end_index]
-
-                # get the data
-                resp: requests.models.Response = requests.post(f'{self.node_norm_endpoint}get_normalized_nodes',
-                                                               json={'curies': data_chunk,
-                                                                     'conflate': self.conflate_node_types})
-
-                # did we get a good status code
-                if resp.status_code == 200:
-                    # convert json to dict
-                    rvs: dict = resp.json()
-
-                    if rvs:
-                        # merge this list with what we have gotten so far
-                        cached_node_norms.update(**rvs)
-                    else:
-                        # this is a quick fix for the API returning empty dict instead of nulls when
-                        # none of the curies normalize
-                        empty_responses = {curie: None for curie in data_chunk}
-                        cached_node_norms.update(empty_responses)
+        # pull any previously normalized curies out of the on-disk cache first
+        if self.norm_cache_db is not None:
+            cached_node_norms.update(self.load_norms_from_cache(to_normalize))
+            to_normalize = [curie for curie in to_normalize if curie not in cached_node_norms]
+
+        self.logger.debug(f'{len(to_normalize)} unique nodes found in this group.')
+
+        # request the chunks concurrently - these calls are I/O bound so threads overlap the round-trips,
+        # chunk_iterator streams the slices so no second copy of the full id list is materialized
+        with ThreadPoolExecutor(max_workers=self.NODE_NORMALIZATION_PARALLEL_REQUESTS) as executor:
+            chunk_futures = [(data_chunk, executor.submit(self.fetch_node_norms, data_chunk))
+                             for data_chunk in chunk_iterator(to_normalize, block_size)]
+            for data_chunk, chunk_future in chunk_futures:
+                chunk_norms = chunk_future.result()
+                if chunk_norms:
+                    # merge this list with what we have gotten so far
+                    cached_node_norms.update(**chunk_norms)
                 else:
-                    # the error that is trapped here means that the entire list of nodes didnt get normalized.
-                    error_message = f'Node norm response code: {resp.status_code}'
-                    self.logger.error(error_message)
-                    resp.raise_for_status()
-
-                # move on down the list
-                start_index += block_size
-            else:
-                break
+                    # this is a quick fix for the API returning empty dict instead of nulls when
+                    # none of the curies normalize
+                    empty_responses = {curie: None for curie in data_chunk}
+                    cached_node_norms.update(empty_responses)
 
-        # reset the node index
-        node_idx = 0
+        # save the newly fetched responses for future runs
+        if self.norm_cache_db is not None and to_normalize:
+            self.save_norms_to_cache({curie: cached_node_norms.get(curie) for curie in to_normalize})
 
         # node ids that failed to normalize
         failed_to_normalize: list = []
@@ -153,10 +144,7 @@ class NodeNormalizer:
 
         # for each node update the node with normalized information
         # store the normalized IDs for later look up
-        while node_idx < node_count:
-
-            # get the next node list item by index
-            current_node = node_list[node_idx]
+        for node_idx, current_node in enumerate(node_list):
             current_node_id = current_node['id']
 
             # make sure there is a name
@@ -202,7 +190,7 @@ class NodeNormalizer:
                 normalized_id = current_node_normalization['id']['identifier']
                 current_node['id'] = normalized_id
                 current_node[NODE_TYPES] = current_node_normalization['type']
-                current_node[SYNONYMS] = list(item['identifier'] for item in current_node_normalization[SYNONYMS])
+                current_node[SYNONYMS] = [item['identifier'] for item in current_node_normalization[SYNONYMS]]
                 if INFORMATION_CONTENT in current_node_normalization:
                     current_node[INFORMATION_CONTENT] = current_node_normalization[INFORMATION_CONTENT]
 
@@ -223,9 +211,6 @@ class NodeNormalizer:
                     # if strict normalization is off keep it and set its previous id in the normalization map
                     self.node_normalization_lookup[current_node_id] = [current_node_id]
 
-            # go to the next node index
-            node_idx += 1
-
         # if something failed to normalize - log it and optionally remove it from the node list
         if len(failed_to_normalize) > 0:
             self.failed_to_normalize_ids.update(failed_to_normalize)
@@ -239,6 +224,61 @@ class NodeNormalizer:
         # return the failed list to the caller
         return failed_to_normalize
 
+    def load_norms_from_cache(self, curies: list) -> dict:
+        """
+        Looks up curies in the on-disk normalization cache.
+
+        :param curies: the list of curies to look up
+        :return: a dict of curie to cached normalization response
+        """
+        cached_norms: dict = {}
+        conflated = int(self.conflate_node_types)
+        # sqlite limits the number of bound parameters, so query in chunks
+        for curie_chunk in chunk_iterator(curies, 500):
+            placeholders = ','.join('?' * len(curie_chunk))
+            rows = self.norm_cache_db.execute(f'SELECT curie, response FROM node_norms '
+                                              f'WHERE conflated = ? AND curie IN ({placeholders})',
+                                              [conflated] + curie_chunk)
+            for curie, response in rows:
+                cached_norms[curie] = quick_json_loads(response)
+        if cached_norms:
+            self.logger.debug(f'{len(cached_norms)} normalization responses found in the cache.')
+        return cached_norms
+
+    def save_norms_to_cache(self, node_norms: dict):
+        """
+        Stores normalization responses in the on-disk cache.
+
+        :param node_norms: a dict of curie to normalization response
+        """
+        conflated = int(self.conflate_node_types)
+        self.norm_cache_db.executemany('INSERT OR REPLACE INTO node_norms VALUES (?, ?, ?)',
+                                       [(curie, conflated, quick_json_dumps(response))
+                                        for curie, response in node_norms.items()])
+        self.norm_cache_db.commit()
+
+    def fetch_node_norms(self, data_chunk: list) -> dict:
+        """
+        Fetches the normalization results for one chunk of curies.
+
+        :param data_chunk: the list of curies to normalize
+        :return: the normalization service response as a dict
+        """
+        # get the data
+        resp: requests.models.Response = self.node_norm_session.post(f'{self.node_norm_endpoint}get_normalized_nodes',
+                                                                     json={'curies': data_chunk,
+                                                                           'conflate': self.conflate_node_types})
+
+        # did we get a good status code
+        if resp.status_code == 200:
+            # convert json to dict - orjson parses the large response payloads much faster than stdlib json
+            return orjson.loads(resp.content)
+        else:
+            # the error that is trapped here means that the entire list of nodes didnt get normalized.
+            error_message = f'Node norm response code: {resp.status_code}'
+            self.logger.error(error_message)
+            resp.raise_for_status()
+
     def normalize_sequence_variants(self, variant_nodes: list):
 
         if not variant_nodes:
@@ -325,6 +325,44 @@ class GetData:
         # return the number of bytes read
         return byte_counter
 
+    def get_ncbi_taxon_id_set(self, taxon_data_dir: str, organism_type: str) -> set:
+        """
+        gets the set of NCBI taxon ids for the organism type passed. the ids come from
+        the nodes.dmp file in ftp://ftp.ncbi.nih.gov/pub/taxonomy/taxdump.tar.gz.
+
+        :param taxon_data_dir: the directory to place the taxdump file temporarily
+        :param organism_type: the NCBI division id of the organisms to capture
+        :return: a set of NCBI taxon ids
+        """
+
+        self.logger.debug('Start of NCBI taxon id retrieval')
+
+        # init the return value
+        ret_val: set = set()
+
+        # get the archive that has the taxon id data
+        self.pull_via_ftp('ftp.ncbi.nih.gov', '/pub/taxonomy', ['taxdump.tar.gz'], taxon_data_dir)
+
+        # open the tar file
+        with tarfile.open(os.path.join(taxon_data_dir, 'taxdump.tar.gz'), 'r:gz') as tar_file:
+            # get a handle to the node data file
+            fp = tar_file.extractfile('nodes.dmp')
+
+            # fields in nodes.dmp are delimited by "\t|\t", so a plain tab split puts the
+            # division id at index 8. no csv quoting rules apply, making the split much
+            # cheaper than a csv reader for a multi-million line file
+            for line in TextIOWrapper(fp, encoding='utf-8'):
+                parts = line.split('\t', 9)
+
+                # is this the organism type we are looking for
+                if len(parts) > 8 and parts[8] == organism_type:
+                    ret_val.add(parts[0])
+
+        self.logger.debug(f'End of NCBI taxon id retrieval. {len(ret_val)} retrieved.')
+
+        # return the set
+        return ret_val
+
     def get_swiss_prot_id_set(self, data_dir: str, debug_mode=False) -> set:
         """
         gets/parses the swiss-prot listing file and returns a set of uniprot kb ids from
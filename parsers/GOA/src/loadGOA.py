@@ -32,6 +32,17 @@ class DATACOLS(enum.IntEnum):
     Gene_Product_Form_ID = 16
 
 
+# hoist the enum member .value lookups out of the per-row extractor callbacks -
+# IntEnum attribute access goes through the descriptor protocol on every call
+DB = DATACOLS.DB.value
+DB_OBJECT_ID = DATACOLS.DB_Object_ID.value
+QUALIFIER = DATACOLS.Qualifier.value
+GO_ID = DATACOLS.GO_ID.value
+DB_REFERENCE = DATACOLS.DB_Reference.value
+ASPECT = DATACOLS.Aspect.value
+TAXON_INTERACTING_TAXON = DATACOLS.Taxon_Interacting_taxon.value
+
+
 ##############
 # Class: UniProtKB GOA loader
 #
@@ -124,9 +135,9 @@ class GOALoader(SourceDataLoader):
         extractor = Extractor()
         with (gzip.open if infile_path.endswith(".gz") else open)(infile_path) as zf:
             extractor.csv_extract(TextIOWrapper(zf, "utf-8"),
-                                  lambda line: f'{line[DATACOLS.DB.value]}:{line[DATACOLS.DB_Object_ID.value]}',
+                                  lambda line: f'{line[DB]}:{line[DB_OBJECT_ID]}',
                                   # extract subject id,
-                                  lambda line: f'{line[DATACOLS.GO_ID.value]}',  # extract object id
+                                  lambda line: f'{line[GO_ID]}',  # extract object id
                                   lambda line: get_goa_predicate(line),  # predicate extractor
                                   lambda line: get_goa_subject_props(line),  # subject props
                                   lambda line: {},  # object props
@@ -156,12 +167,12 @@ GOA_PREDICATES = {'enables':'RO:0002327',
 
 
 def get_goa_predicate(line: list):
-    supplied_qualifier = line[DATACOLS.Qualifier.value]
+    supplied_qualifier = line[QUALIFIER]
     if "|" in supplied_qualifier:
         # TODO example of negation that we can't support - this could be NOT|enables
         return None
     elif not supplied_qualifier:
-        aspect = line[DATACOLS.Aspect]
+        aspect = line[ASPECT]
         if aspect == 'F':  # molecular function
             return GOA_PREDICATES['enables']
         elif aspect == 'P':  # biological process
@@ -177,7 +188,7 @@ def get_goa_predicate(line: list):
 def get_goa_edge_properties(line: list):
     edge_properties = {PRIMARY_KNOWLEDGE_SOURCE: GOALoader.provenance_id}
     publications = []
-    evidence_field = line[DATACOLS.DB_Reference.value]
+    evidence_field = line[DB_REFERENCE]
     for evidence in evidence_field.split('|'):
         if 'PMID' in evidence:
             publications.append(evidence)
@@ -187,7 +198,7 @@ def get_goa_edge_properties(line: list):
 
 
 def get_goa_subject_props(line: list):
-    taxon_id = line[DATACOLS.Taxon_Interacting_taxon].split('|')[0].split(':')[-1]
+    taxon_id = line[TAXON_INTERACTING_TAXON].split('|')[0].split(':')[-1]
     return {"taxon": f'{NCBITAXON}:{taxon_id}'} if taxon_id else {}
 
 
@@ -221,7 +232,7 @@ class PlantGOALoader(GOALoader):
         self.plant_taxa_file = 'plant_taxa.txt'
         self.data_files = [self.plant_taxa_file, self.goa_data_file]
         self.data_urls = [self.plant_taxa_url, self.goa_data_url]
-        self.taxon_filter_field = DATACOLS.Taxon_Interacting_taxon.value
+        self.taxon_filter_field = TAXON_INTERACTING_TAXON
 
     def get_taxon_filter_set(self):
         plant_taxa_path = os.path.join(self.data_path, self.plant_taxa_file)
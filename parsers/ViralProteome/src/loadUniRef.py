@@ -1,15 +1,75 @@
 import os
+import sys
 import argparse
-import pandas as pd
 import logging
 import datetime
 
-from xml.etree import ElementTree as ETree
-from Common.utils import LoggingUtil, GetData
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from lxml import etree
+from Common.utils import LoggingUtil, GetData, quick_jsonl_file_iterator
 from Common.kgx_file_writer import KGXFileWriter
 from Common.loader_interface import SourceDataLoader
 
 
+def parse_uniref_file_to_part_files(test_mode: bool,
+                                    source_data_dir: str,
+                                    uniref_infile_path: str,
+                                    part_nodes_file_path: str,
+                                    part_edges_file_path: str,
+                                    target_taxa: frozenset) -> (int, int):
+    """
+    Worker for parsing one UniRef file in a subprocess.
+
+    Builds its own loader and KGX writer so nothing needs to be shared across
+    processes; the part files are merged by the parent afterwards.
+
+    :return: record counts from the parse
+    """
+    loader = UniRefSimLoader(test_mode=test_mode, source_data_dir=source_data_dir)
+    with KGXFileWriter(part_nodes_file_path, part_edges_file_path) as part_file_writer:
+        return loader.parse_data_file(part_file_writer, uniref_infile_path, target_taxa)
+
+
+@dataclass
+class NodeBatch:
+    """
+    Columnar storage for the nodes captured from a batch of uniref entries.
+
+    Keeping parallel lists instead of a dict per node avoids the per-node hash table
+    overhead and lets the batch feed the node de-duplication column-wise.
+    """
+    id: list = field(default_factory=list)
+    name: list = field(default_factory=list)
+    category: list = field(default_factory=list)
+    equivalent_identifiers: list = field(default_factory=list)
+    similarity_bin: list = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.id)
+
+    def append(self, node_id: str, name: str, category: str, equivalent_identifiers: str, similarity_bin: str):
+        self.id.append(node_id)
+        self.name.append(name)
+        self.category.append(category)
+        self.equivalent_identifiers.append(equivalent_identifiers)
+        self.similarity_bin.append(similarity_bin)
+
+    def extend(self, other):
+        self.id.extend(other.id)
+        self.name.extend(other.name)
+        self.category.extend(other.category)
+        self.equivalent_identifiers.extend(other.equivalent_identifiers)
+        self.similarity_bin.extend(other.similarity_bin)
+
+    def clear(self):
+        self.id.clear()
+        self.name.clear()
+        self.category.clear()
+        self.equivalent_identifiers.clear()
+        self.similarity_bin.clear()
+
+
 ##############
 # Class: UniRef similarities loader
 #
@@ -21,6 +81,9 @@ class UniRefSimLoader(SourceDataLoader):
     # UniProtKB viral organism column type for nodes.dmp
     TYPE_VIRUS: str = '9'
 
+    # default categories for taxon nodes - one shared string object for every captured node
+    DEFAULT_TAXON_CATEGORY: str = sys.intern('biolink:OrganismTaxon|biolink:OntologyClass|biolink:NamedThing')
+
     source_id = 'UniRef'
     provenance_id = 'infores:uniref'
     description = ""
@@ -36,6 +99,9 @@ class UniRefSimLoader(SourceDataLoader):
         """
         super().__init__(test_mode=test_mode, source_data_dir=source_data_dir)
 
+        # keep the storage directory so parse workers can be constructed with it
+        self.source_data_dir = source_data_dir
+
         # set global variables
         self.data_file = 'Uniref50/90/100.xml'
         self.source_db = 'UniProt UniRef gene similarity data'
@@ -110,36 +176,59 @@ class UniRefSimLoader(SourceDataLoader):
 
         self.logger.info(f'UniRefSimLoader - Start of UniRef data processing.')
 
-        # declare the name of the taxon index file
-        taxon_index_file = 'taxon_file_indexes.txt'
-
         # declare the list of uniref input file names
         in_file_names: list = ['UniRef50', 'UniRef90', 'UniRef100']
 
-        # get the list of taxons to process
-        target_taxon_set = self.get_uniref_data()
+        # get the list of taxons to process - frozen since membership tests dominate the parse
+        target_taxon_set = frozenset(self.get_uniref_data())
 
         final_record_count: int = 0
         final_skipped_count: int = 0
 
         with KGXFileWriter(nodes_output_file_path, edges_output_file_path) as file_writer:
-            # for each UniRef file to process
-            for f in in_file_names:
-                self.logger.debug(f'Processing {f}.')
-
-                # add the file extension to the raw data
-                if self.test_mode:
-                    full_file = f + '.test.xml'
-                else:
-                    full_file = f + '.xml'
-
-                # read the file and make the list
-                records, skipped = self.parse_data_file(file_writer, os.path.join(self.data_path, full_file), os.path.join(self.data_path, f'{f}_{taxon_index_file}'), target_taxon_set)
+            # parse the UniRef files concurrently, one worker process per file, each
+            # writing node/edge part files that get merged below
+            part_file_paths: list = []
+            parse_futures: list = []
+            with ProcessPoolExecutor(max_workers=min(len(in_file_names), os.cpu_count())) as executor:
+                for f in in_file_names:
+                    self.logger.debug(f'Processing {f}.')
+
+                    # add the file extension to the raw data
+                    if self.test_mode:
+                        full_file = f + '.test.xml'
+                    else:
+                        full_file = f + '.xml'
+
+                    # declare the part files for this worker
+                    part_nodes_file_path = f'{nodes_output_file_path}.{f}.part'
+                    part_edges_file_path = f'{edges_output_file_path}.{f}.part'
+                    part_file_paths.append((part_nodes_file_path, part_edges_file_path))
+
+                    # hand the file off to a parse worker
+                    parse_futures.append(executor.submit(parse_uniref_file_to_part_files,
+                                                         self.test_mode,
+                                                         self.source_data_dir,
+                                                         os.path.join(self.data_path, full_file),
+                                                         part_nodes_file_path,
+                                                         part_edges_file_path,
+                                                         target_taxon_set))
+
+            # merge the part files through the shared writer, which de-duplicates node ids across files
+            for f, (part_nodes_file_path, part_edges_file_path), parse_future in zip(in_file_names, part_file_paths, parse_futures):
+                records, skipped = parse_future.result()
 
                 # add to the final counts
                 final_record_count += records
                 final_skipped_count += skipped
 
+                file_writer.write_normalized_nodes(quick_jsonl_file_iterator(part_nodes_file_path))
+                file_writer.write_normalized_edges(quick_jsonl_file_iterator(part_edges_file_path))
+
+                # the part files are no longer needed
+                os.remove(part_nodes_file_path)
+                os.remove(part_edges_file_path)
+
                 self.logger.info(f'UniRefSimLoader - {f} Processing complete.')
 
             # load up the metadata
@@ -151,19 +240,19 @@ class UniRefSimLoader(SourceDataLoader):
         # return the metadata to the caller
         return load_metadata
 
-    def parse_data_file(self, file_writer, uniref_infile_path: str, index_file_path: str, target_taxa: set) -> (int, int):
+    def parse_data_file(self, file_writer, uniref_infile_path: str, target_taxa: set) -> (int, int):
         """
         Parses the data file for graph nodes/edges and writes them to the KGX csv files.
 
-        The parsing uses and entry index file to read the uniref entry data elements on the fly rather.
+        The uniref entry elements are streamed with lxml iterparse so the whole file is
+        never held in memory.
 
         :param uniref_infile_path: the name of the uniref file to process
-        :param index_file_path: the name of the uniref entry index file
         :param target_taxa: the set of target virus taxon ids
         :return: ret_val: record counts
         """
-        # init the array that will contain nodes to write to KGX files
-        node_list: list = []
+        # init the batch that will contain nodes to write to KGX files
+        node_batch: NodeBatch = NodeBatch()
 
         # init the record counters
         record_counter: int = 0
@@ -171,120 +260,57 @@ class UniRefSimLoader(SourceDataLoader):
 
         self.logger.debug(f'Parsing XML data file start.')
 
-        # open the taxon file indexes and the uniref data file
-        with open(index_file_path, 'r') as index_fp, open(uniref_infile_path, 'rb+') as uniref_fp:
-            # for each taxon index
-            for line in index_fp:
-                # increment the node counter
-                record_counter += 1
-
-                # output a status indicator
-                if record_counter % 10000 == 0:
-                    self.logger.debug(f'Completed {record_counter} taxa.')
-
-                    # write out what we have
-                    self.get_edge_list(node_list)
-                    self.get_node_list(node_list)
+        # stream through the uniref entry elements ('{*}' matches the uniref namespace)
+        context = etree.iterparse(uniref_infile_path, events=('end',), tag='{*}entry', huge_tree=True, collect_ids=False)
 
-                    self.write_to_file_x(file_writer)
-                    node_list.clear()
+        # for each entry element
+        for _, entry_element in context:
+            # increment the node counter
+            record_counter += 1
 
-                # start looking a bit before the location grep found
-                taxon_index = int(line.split(':')[0]) - 150
+            # output a status indicator
+            if record_counter % 10000 == 0:
+                self.logger.debug(f'Completed {record_counter} entries.')
 
-                # get the next entry element
-                entry_element: str = self.get_entry_element(taxon_index, uniref_fp)
+                # write out what we have
+                self.get_node_list(node_batch)
 
-                # did we get something back
-                if entry_element != '':
-                    # call to get an entry and enter it into the node list
-                    good_record: bool = self.capture_entry_data(entry_element, node_list, target_taxa)
+                self.write_to_file_x(file_writer)
+                node_batch.clear()
 
-                    # was the record parsed properly
-                    if not good_record:
-                        # increment the node counter
-                        skipped_record_counter += 1
+            # call to get an entry and enter it into the node list
+            good_record: bool = self.capture_entry_data(entry_element, node_batch, target_taxa)
 
-                        self.logger.debug(f'Error: Entry node for {line} at line number {record_counter} was not captured.')
-                else:
-                    # increment the node counter
-                    skipped_record_counter += 1
+            # was the record parsed properly
+            if not good_record:
+                # increment the node counter
+                skipped_record_counter += 1
 
-                    self.logger.debug(f'Error: Entry node for {line} at line number {record_counter} invalid.')
+                self.logger.debug(f'Error: Entry node {record_counter} was not captured.')
 
-                # TODO: remove after testing
-                # if record_counter > 10:
-                #    break
+            # clear the processed element and its preceding siblings to keep memory flat
+            entry_element.clear()
+            parent = entry_element.getparent()
+            if parent is not None:
+                while entry_element.getprevious() is not None:
+                    del parent[0]
 
         # save any remainders
-        if len(node_list) > 0:
-            # sort the node list
-            # node_list = sorted(node_list, key=lambda x: (x['grp'], x['node_num']))
-
+        if len(node_batch) > 0:
             # write out what we have
-            self.get_edge_list(node_list)
-            self.get_node_list(node_list)
+            self.get_node_list(node_batch)
             self.write_to_file_x(file_writer)
 
-        self.logger.debug(f'Parsing XML data file complete. {record_counter} taxa processed.')
+        self.logger.debug(f'Parsing XML data file complete. {record_counter} entries processed.')
 
         return record_counter, skipped_record_counter
 
-    @staticmethod
-    def get_entry_element(taxon_index: int, uniref_fp) -> str:
-        """
-        Looks for and returns the entry node at the byte location passed
-
-        :param taxon_index: the index into the uniref file to start looking
-        :param uniref_fp:  the file pointer to the uniref file
-        :return: the text of the uniref entry node
+    def capture_entry_data(self, entry_element, node_batch: NodeBatch, in_taxon_set: set) -> bool:
         """
+        Parses an entry element to create graph nodes.
 
-        # init the return
-        entry_node_text: str = ''
-
-        # backup up to 500 characters max to look for the "<entry>" start
-        for i in range(0, 500):
-            # goto the last checked position
-            uniref_fp.seek(taxon_index)
-
-            # read 6 characters to see if it is the start of the entry
-            uniref_line = uniref_fp.read(6)
-
-            # did we find the entry start
-            if uniref_line.decode("utf-8") == "<entry":
-                # go back to the start of the 'entry'
-                uniref_fp.seek(taxon_index)
-
-                # start writing out data until we see the end of the entry
-                while True:
-                    # get the line form the uniref file
-                    uniref_line = uniref_fp.readline().decode("utf-8")
-
-                    # no need to save the DNA sequence data
-                    if uniref_line.startswith('  <seq'):
-                        continue
-
-                    # write out the line
-                    entry_node_text += uniref_line
-
-                    # did we find the end of the entry
-                    if uniref_line.startswith('</entr'):
-                        break
-                break
-            else:
-                # move up a character and recheck
-                taxon_index -= 1
-
-        # return the entry node text to the caller
-        return entry_node_text
-
-    def capture_entry_data(self, entry_element: str, node_list: list, in_taxon_set: set) -> bool:
-        """
-        Loads the xml string and parses it to create graph nodes.
-
-        :param entry_element: the text of the XML entry node
-        :param node_list:
+        :param entry_element: the XML entry element
+        :param node_batch: the batch of nodes captured so far
         :param in_taxon_set: the list of taxa that we are interested in capturing
         :return:
         """
@@ -292,28 +318,30 @@ class UniRefSimLoader(SourceDataLoader):
         # init the return
         good_record: bool = False
 
-        # load up the entry element
-        root = ETree.fromstring(entry_element)
+        # the entry is the root of the parsed element
+        root = entry_element
 
         # set the entry name
         entry_name = root.attrib['id'].replace('_', ':')
 
-        # set the group id and similarity bin name
+        # set the group id and similarity bin name. the bin is one of only three values
+        # (UniRef50/90/100) so interning it makes every node in the batch share one string
         grp: str = entry_name.split(':')[1]
-        similarity_bin: str = entry_name.split(':')[0]
+        similarity_bin: str = sys.intern(entry_name.split(':')[0])
 
-        # create local storage for the nodes will conditionally add to main node list later
-        tmp_node_list: list = []
+        # create local storage for the nodes and edges, conditionally added to the main lists later
+        tmp_node_batch: NodeBatch = NodeBatch()
+        tmp_edge_list: list = []
 
         # init the node counter
         node_counter: int = 0
 
+        # init the representative member node id (aka entry id)
+        rep_member_node_id: str = ''
+
         # init the flag to indicate we did something
         virus_capture: bool = False
 
-        # declare some default categories for genes and taxons
-        default_taxon_category: str = 'biolink:OrganismTaxon|biolink:OntologyClass|biolink:NamedThing'
-
         # loop through the child elements of the entry
         for entry_child in root:
             """
@@ -326,17 +354,24 @@ class UniRefSimLoader(SourceDataLoader):
 
             try:
                 if entry_child.attrib['type'] == 'common taxon ID':
+                    # if the common taxon isnt a target there is no point scanning the members
+                    if entry_child.attrib['value'] not in in_taxon_set:
+                        return good_record
+
                     # we found a virus to capture
                     virus_capture = True
             except KeyError:
                 pass
 
+            # get the tag name without the uniref namespace
+            entry_child_tag = etree.QName(entry_child).localname if isinstance(entry_child.tag, str) else ''
+
             # get the similar members that are related to the entry. there could be a large number of these
-            if virus_capture and (entry_child.tag == 'member' or entry_child.tag == 'representativeMember'):
+            if virus_capture and (entry_child_tag == 'member' or entry_child_tag == 'representativeMember'):
                 # loop through the members
                 for member in iter(entry_child):
                     # look for the DB reference node.
-                    if member.tag == 'dbReference':
+                    if isinstance(member.tag, str) and etree.QName(member).localname == 'dbReference':
                         # logger.debug(f"\t\tCluster dbReference\" element member: \"{member.attrib['type']}\" is {member.attrib['id']}.")
                         member_uniprotkb_id: str = member.attrib['id']
 
@@ -349,7 +384,7 @@ class UniRefSimLoader(SourceDataLoader):
                         # loop through the reference member properties
                         for db_ref_prop in member:
                             # get the needed DB reference properties for the similar member
-                            if db_ref_prop.tag == 'property' and db_ref_prop.attrib['type'] in {'UniProtKB accession', 'source organism', 'NCBI taxonomy', 'protein name'}:
+                            if isinstance(db_ref_prop.tag, str) and etree.QName(db_ref_prop).localname == 'property' and db_ref_prop.attrib['type'] in {'UniProtKB accession', 'source organism', 'NCBI taxonomy', 'protein name'}:
                                 if db_ref_prop.attrib['type'] == 'UniProtKB accession':
                                     if not found_uniprot_access:
                                         found_uniprot_access = True
@@ -369,12 +404,25 @@ class UniRefSimLoader(SourceDataLoader):
                                 protein_name: str = member_props["protein name"]
 
                                 # add the member Uniprot KB accession node
-                                tmp_node_list.append({'grp': grp, 'node_num': node_counter, 'id': uniprot, 'name': protein_name,
-                                                      'category': '', 'equivalent_identifiers': uniprot, 'similarity_bin': similarity_bin})
+                                tmp_node_batch.append(uniprot, protein_name, '', uniprot, similarity_bin)
 
                                 # add the member NCBI taxon node
-                                tmp_node_list.append({'grp': grp, 'node_num': node_counter, 'id': ncbi_taxon, 'name': source_organ,
-                                                      'category': default_taxon_category, 'similarity_bin': similarity_bin})
+                                tmp_node_batch.append(ncbi_taxon, source_organ, self.DEFAULT_TAXON_CATEGORY, '', similarity_bin)
+
+                                # the first member pair captured is the representative member
+                                if node_counter == 0:
+                                    rep_member_node_id = uniprot
+
+                                # the similarity bin is the same for all child xml elements of this entry
+                                props = {'similarity_bin': similarity_bin}
+
+                                # add the spoke edge if it isn't a reflection of itself
+                                if rep_member_node_id != uniprot:
+                                    # this edge represents the UniProt similarity
+                                    tmp_edge_list.append({"subject": rep_member_node_id, "predicate": "RO:HOM0000000", "object": uniprot, 'properties': props})
+
+                                # this edge represents the taxon relation
+                                tmp_edge_list.append({"subject": uniprot, "predicate": "RO:0002162", "object": ncbi_taxon, 'properties': props})
 
                                 # make ready for the next member node pair
                                 node_counter += 1
@@ -383,105 +431,42 @@ class UniRefSimLoader(SourceDataLoader):
                             pass
 
         # did we get at 1 representative node set (uniprot -> taxon)
-        if len(tmp_node_list) >= 2:
+        if len(tmp_node_batch) >= 2:
             good_record = True
-            node_list.extend(tmp_node_list)
+            node_batch.extend(tmp_node_batch)
+            self.final_edge_list.extend(tmp_edge_list)
 
         return good_record
 
-    def get_node_list(self, node_list):
+    def get_node_list(self, node_batch: NodeBatch):
         """
-        gets the data collected from the UniRef file node list
+        gets the data collected from the UniRef file node batch
 
         :return:
         """
-        self.logger.debug(f'Loading data frame with {len(node_list)} nodes.')
-
-        # create a data frame with the node list
-        df: pd.DataFrame = pd.DataFrame(node_list, columns=['grp', 'node_num', 'id', 'name', 'category', 'similarity_bin'])
+        self.logger.debug(f'De-duplicating {len(node_batch)} nodes.')
 
-        # reshape the data frame and remove all node duplicates.
-        new_df = df.drop(['grp', 'node_num'], axis=1)
-        new_df = new_df.drop_duplicates(keep='first')
-
-        self.logger.debug(f'{len(new_df.index)} nodes found.')
+        # track the unique nodes with a set of column tuples
+        seen_nodes: set = set()
 
         # write out the unique nodes
-        for item in new_df.iterrows():
+        for node_id, node_name, node_category, similarity_bin in zip(node_batch.id, node_batch.name, node_batch.category, node_batch.similarity_bin):
+            # skip nodes we have already captured
+            node_key = (node_id, node_name, node_category, similarity_bin)
+            if node_key in seen_nodes:
+                continue
+            seen_nodes.add(node_key)
+
             # get the properties for the node. ncbi taxons get a taxon property
-            if item[1]['id'].startswith('NCBITaxon'):
-                props = {'similarity_bin': item[1]['similarity_bin'], 'taxon': item[1]['id']}
+            if node_id.startswith('NCBITaxon'):
+                props = {'similarity_bin': similarity_bin, 'taxon': node_id}
             else:
-                props = {'similarity_bin': item[1]['similarity_bin']}
+                props = {'similarity_bin': similarity_bin}
 
             # save the node
-            self.final_node_list.append({'id': item[1]['id'], 'name': item[1]['name'], 'category': [], 'properties': props})
-
-    def get_edge_list(self, node_list):
-        """
-        writes edges for the node list passed
-
-        :return: nothing
-        """
-
-        self.logger.debug(f'Creating edges for {len(node_list)} nodes.')
-
-        # init group detection
-        node_idx: int = 0
-        cur_group_name = node_list[node_idx]['grp']
-
-        # save the node list count to avoid grabbing it over and over
-        node_count: int = len(node_list)
-
-        # iterate through node groups and create the edge records.
-        while node_idx < node_count:
-            self.logger.debug(f'Working index: {node_idx}')
-
-            # init the representative member node (aka entry id)
-            rep_member_node_id: str = ''
-
-            # for each entry member in the group
-            while node_list[node_idx]['grp'] == cur_group_name:
-                """
-                For all member node pairs (representative or cluster) where node number N starts at 1...
-                    Member ID (UniProtKB accession) and taxon ID (NCBI taxonomy)
-                    Ex. (node number N+1 and 0): (gene UniProt:A0A0F6NZX8)-[in_taxon]-(NCBITaxon:10493)
-
-                (Optional) Combination Member ID (UniProtKB accession) to Member ID (UniProtKB accession)
-                Ex. (node number X and Y): (gene UniProt:Q6GZX4)-[SO:similar_to]-(gene UniProt:A0A0F6NZX8)            
-                """
-
-                # if this is the first node capture the representative id (same as the xml entry id)
-                if node_list[node_idx]['node_num'] == 0:
-                    rep_member_node_id = node_list[node_idx]['id']
-
-                # the similarity bin is the same for all child xml elements of this entry
-                props = {'similarity_bin': node_list[node_idx]['similarity_bin']}
-
-                # add the spoke edge if it isn't a reflection of itself
-                if rep_member_node_id != node_list[node_idx]['id']:
-                    # this node represents the UniProt id
-                    self.final_edge_list.append({"subject": rep_member_node_id, "predicate": "RO:HOM0000000", "object": node_list[node_idx]['id'], 'properties': props})
-
-                # this node represents the taxon id
-                self.final_edge_list.append({"subject": node_list[node_idx]['id'], "predicate": "RO:0002162", "object": node_list[node_idx + 1]['id'], 'properties': props})
-
-                # increment the node counter pairing index
-                node_idx += 2
-
-                # insure we dont overrun the list
-                if node_idx >= node_count:
-                    break
-
-            # insure we dont overrun the list
-            if node_idx >= node_count:
-                break
-
-            # save the new group name
-            cur_group_name = node_list[node_idx]['grp']
-
-        self.logger.debug(f'{node_idx} Entry member edges created.')
+            self.final_node_list.append({'id': node_id, 'name': node_name, 'category': [], 'properties': props})
 
+        self.logger.debug(f'{len(seen_nodes)} nodes found.')
 
 if __name__ == '__main__':
     # create a command line parser
@@ -4,10 +4,42 @@ import argparse
 import tarfile
 
 from csv import reader
-from Common.utils import GetData
+from concurrent.futures import ProcessPoolExecutor
+from Common.utils import GetData, quick_jsonl_file_iterator
 from Common.extractor import Extractor
+from Common.kgx_file_writer import KGXFileWriter
 from Common.loader_interface import SourceDataLoader
-from parsers.GOA.src.loadGOA import get_goa_predicate, get_goa_edge_properties, get_goa_subject_props, DATACOLS
+from parsers.GOA.src.loadGOA import get_goa_predicate, get_goa_edge_properties, get_goa_subject_props, \
+    DB, DB_OBJECT_ID, GO_ID
+
+
+def parse_gaf_files_to_part_files(goa_data_dir: str,
+                                  gaf_file_names: list,
+                                  part_nodes_file_path: str,
+                                  part_edges_file_path: str) -> dict:
+    """
+    Worker for parsing a batch of GAF files in a subprocess.
+
+    The GAF files are independent of each other, so each worker parses its batch
+    into part files with its own KGX writer; the parent merges the part files
+    afterwards, which also de-duplicates node ids across batches.
+
+    :return: dict of load statistics for the batch
+    """
+    with KGXFileWriter(part_nodes_file_path, part_edges_file_path) as part_file_writer:
+        extractor = Extractor(file_writer=part_file_writer)
+        for gaf_file_name in gaf_file_names:
+            with open(os.path.join(goa_data_dir, gaf_file_name), 'r', encoding="utf-8") as fp:
+                extractor.csv_extract(fp,
+                                      lambda line: f'{line[DB]}:{line[DB_OBJECT_ID]}',
+                                      # extract subject id,
+                                      lambda line: f'{line[GO_ID]}',  # extract object id
+                                      lambda line: get_goa_predicate(line),  # predicate extractor
+                                      lambda line: get_goa_subject_props(line),  # subject props
+                                      lambda line: {},  # object props
+                                      lambda line: get_goa_edge_properties(line),  # edge props
+                                      comment_character="!", delim='\t')
+        return extractor.load_metadata
 
 
 ##############
@@ -147,22 +179,40 @@ class VPLoader(SourceDataLoader):
 
         all_files = self.uniprot_file_list
         all_files.append(self.uniprot_sars_cov_2_file)
-        extractor = Extractor(file_writer=self.output_file_writer)
-        file_count = 0
-        for f in all_files:
-            file_count += 1
-            with open(os.path.join(self.data_path, f), 'r', encoding="utf-8") as fp:
-                extractor.csv_extract(fp,
-                                      lambda line: f'{line[DATACOLS.DB.value]}:{line[DATACOLS.DB_Object_ID.value]}',
-                                      # extract subject id,
-                                      lambda line: f'{line[DATACOLS.GO_ID.value]}',  # extract object id
-                                      lambda line: get_goa_predicate(line),  # predicate extractor
-                                      lambda line: get_goa_subject_props(line),  # subject props
-                                      lambda line: {},  # object props
-                                      lambda line: get_goa_edge_properties(line),  # edge props
-                                      comment_character="!", delim='\t')
 
-        return extractor.load_metadata
+        # the GAF files are independent, so spread them across parse workers
+        num_workers = min(len(all_files), os.cpu_count())
+        file_batches = [all_files[i::num_workers] for i in range(num_workers)]
+
+        load_metadata = {'record_counter': 0, 'skipped_record_counter': 0, 'errors': []}
+        part_file_paths = []
+        parse_futures = []
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            for i, file_batch in enumerate(file_batches):
+                part_nodes_file_path = os.path.join(self.data_path, f'vp_nodes_{i}.jsonl.part')
+                part_edges_file_path = os.path.join(self.data_path, f'vp_edges_{i}.jsonl.part')
+                part_file_paths.append((part_nodes_file_path, part_edges_file_path))
+                parse_futures.append(executor.submit(parse_gaf_files_to_part_files,
+                                                     self.data_path,
+                                                     file_batch,
+                                                     part_nodes_file_path,
+                                                     part_edges_file_path))
+
+        # merge the part files through the shared writer, which de-duplicates node ids across batches
+        for (part_nodes_file_path, part_edges_file_path), parse_future in zip(part_file_paths, parse_futures):
+            batch_metadata = parse_future.result()
+            load_metadata['record_counter'] += batch_metadata['record_counter']
+            load_metadata['skipped_record_counter'] += batch_metadata['skipped_record_counter']
+            load_metadata['errors'].extend(batch_metadata['errors'])
+
+            self.output_file_writer.write_normalized_nodes(quick_jsonl_file_iterator(part_nodes_file_path))
+            self.output_file_writer.write_normalized_edges(quick_jsonl_file_iterator(part_edges_file_path))
+
+            # the part files are no longer needed
+            os.remove(part_nodes_file_path)
+            os.remove(part_edges_file_path)
+
+        return load_metadata
 
 if __name__ == '__main__':
     # create a command line parser
@@ -2,6 +2,7 @@ import os
 import enum
 
 from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
 from Common.utils import GetData
 from Common.loader_interface import SourceDataLoader
 from Common.extractor import Extractor
@@ -47,6 +48,55 @@ class TRIALSDATACOLS(enum.IntEnum):
     COUNT = 3
 
 
+# hoist the enum member .value lookups out of the per-row extractor lambdas -
+# IntEnum attribute access goes through the descriptor protocol on every call
+SB_SUBJECT = SBEDGESDATACOLS.SUBJECT.value
+SB_OBJECT = SBEDGESDATACOLS.OBJECT.value
+SB_ENRICHMENT = SBEDGESDATACOLS.ENRICHMENT.value
+SB_EFFECTIVE_PUBS = SBEDGESDATACOLS.EFFECTIVE_PUBS.value
+
+SG_SUBJECT = SGEDGESDATACOLS.SUBJECT.value
+SG_OBJECT = SGEDGESDATACOLS.OBJECT.value
+SG_ENRICHMENT = SGEDGESDATACOLS.ENRICHMENT.value
+SG_EFFECTIVE_PUBS = SGEDGESDATACOLS.EFFECTIVE_PUBS.value
+
+PHENOTYPE_ID = PHENOTYPESDATACOLS.PHENOTYPE_ID.value
+PHENOTYPE_NOTE = PHENOTYPESDATACOLS.PHENOTYPE_NOTE.value
+
+TRIALS_DRUG_ID = TRIALSDATACOLS.DRUG_ID.value
+TRIALS_PREDICATE = TRIALSDATACOLS.PREDICATE.value
+TRIALS_TARGET_ID = TRIALSDATACOLS.TARGET_ID.value
+TRIALS_COUNT = TRIALSDATACOLS.COUNT.value
+
+
+class Cord19EdgeMirroringWriter:
+    """
+    Thin wrapper around a KGXFileWriter that duplicates every edge attached to
+    the covid disease node onto the SARS-CoV-2 taxon node and vice versa.
+
+    Doing the mirroring as edges are written lets Cord19Loader stream straight
+    to disk instead of holding every edge in memory for a second pass.
+    """
+    def __init__(self, file_writer, disease_id: str, taxon_id: str):
+        self.file_writer = file_writer
+        self.mirrored_node_ids = {disease_id: taxon_id, taxon_id: disease_id}
+
+    def write_kgx_node(self, node):
+        self.file_writer.write_kgx_node(node)
+
+    def write_kgx_edge(self, edge):
+        self.file_writer.write_kgx_edge(edge)
+        mirrored_edge = None
+        if edge.subjectid in self.mirrored_node_ids:
+            mirrored_edge = deepcopy(edge)
+            mirrored_edge.subjectid = self.mirrored_node_ids[edge.subjectid]
+        elif edge.objectid in self.mirrored_node_ids:
+            mirrored_edge = deepcopy(edge)
+            mirrored_edge.objectid = self.mirrored_node_ids[edge.objectid]
+        if mirrored_edge and mirrored_edge.subjectid != mirrored_edge.objectid:
+            self.file_writer.write_kgx_edge(mirrored_edge)
+
+
 ##############
 # Class: cord19 data source loader
 #
@@ -79,6 +129,7 @@ class Cord19Loader(SourceDataLoader):
         self.related_to_predicate = 'biolink:correlated_with'
 
         self.covid_node_id = 'MONDO:0100096'
+        self.coronavirus_taxon_id = 'NCBITaxon:2697049'
         self.has_phenotype_predicate = 'RO:0002200'
         self.covid_phenotypes_url = 'https://stars.renci.org/var/data_services/cord19/'
         self.covid_phenotypes_file_name = 'covid_phenotypes.csv'
@@ -114,9 +165,13 @@ class Cord19Loader(SourceDataLoader):
             f'{self.scrigraph_url}{self.scigraph_edges_file_name}',
             f'{self.drug_bank_trials_url}{self.drug_bank_trials_file_name}'
         ]
+        # the pulls are network-latency-bound and independent, so fetch them concurrently
         data_puller = GetData()
-        for source_url in sources_to_pull:
-            data_puller.pull_via_http(source_url, self.data_path)
+        with ThreadPoolExecutor(max_workers=len(sources_to_pull)) as executor:
+            pull_futures = [executor.submit(data_puller.pull_via_http, source_url, self.data_path)
+                            for source_url in sources_to_pull]
+            for pull_future in pull_futures:
+                pull_future.result()
 
         return True
 
@@ -127,7 +182,13 @@ class Cord19Loader(SourceDataLoader):
         :return: ret_val: load_metadata
         """
 
-        extractor = Extractor()
+        # we want to duplicate all the edges attached to the nodes for covid as a disease
+        # and SARS-CoV-2 as a taxon - the mirroring writer handles that as edges stream
+        # through to the output files
+        mirroring_writer = Cord19EdgeMirroringWriter(self.output_file_writer,
+                                                     disease_id=self.covid_node_id,
+                                                     taxon_id=self.coronavirus_taxon_id)
+        extractor = Extractor(file_writer=mirroring_writer)
         """
         # See NOTE 1 above about nodes files
         #
@@ -150,13 +211,13 @@ class Cord19Loader(SourceDataLoader):
         edges_file: str = os.path.join(self.data_path, self.scibite_edges_file_name)
         with open(edges_file, 'r') as fp:
             extractor.csv_extract(fp,
-                                  lambda line: line[SBEDGESDATACOLS.SUBJECT.value].replace('_', ''),  # subject id
-                                  lambda line: line[SBEDGESDATACOLS.OBJECT.value].replace('_', ''),  # object id
+                                  lambda line: line[SB_SUBJECT].replace('_', ''),  # subject id
+                                  lambda line: line[SB_OBJECT].replace('_', ''),  # object id
                                   lambda line: self.related_to_predicate,  # predicate extractor
                                   lambda line: {},  # subject props
                                   lambda line: {},  # object props
-                                  lambda line: {'num_publications': float(line[SBEDGESDATACOLS.EFFECTIVE_PUBS.value]),
-                                                'enrichment_p': float(line[SBEDGESDATACOLS.ENRICHMENT.value]),
+                                  lambda line: {'num_publications': float(line[SB_EFFECTIVE_PUBS]),
+                                                'enrichment_p': float(line[SB_ENRICHMENT]),
                                                 PRIMARY_KNOWLEDGE_SOURCE: 'infores:cord19-scibite'},#edgeprops
                                   comment_character=None,
                                   delim='\t',
@@ -166,13 +227,13 @@ class Cord19Loader(SourceDataLoader):
         edges_file: str = os.path.join(self.data_path, self.scigraph_edges_file_name)
         with open(edges_file, 'r') as fp:
             extractor.csv_extract(fp,
-                                  lambda line: line[SGEDGESDATACOLS.SUBJECT.value],  # subject id
-                                  lambda line: line[SGEDGESDATACOLS.OBJECT.value],  # object id
+                                  lambda line: line[SG_SUBJECT],  # subject id
+                                  lambda line: line[SG_OBJECT],  # object id
                                   lambda line:  self.related_to_predicate,  # predicate extractor
                                   lambda line: {},  # subject props
                                   lambda line: {},  # object props
-                                  lambda line: {'num_publications': float(line[SGEDGESDATACOLS.EFFECTIVE_PUBS.value]),
-                                                'enrichment_p': float(line[SGEDGESDATACOLS.ENRICHMENT.value]),
+                                  lambda line: {'num_publications': float(line[SG_EFFECTIVE_PUBS]),
+                                                'enrichment_p': float(line[SG_ENRICHMENT]),
                                                 PRIMARY_KNOWLEDGE_SOURCE: self.provenance_id},#edgeprops
                                   comment_character=None,
                                   delim='\t',
@@ -183,11 +244,11 @@ class Cord19Loader(SourceDataLoader):
         with open(phenotypes_file, 'r') as fp:
             extractor.csv_extract(fp,
                                   lambda line: self.covid_node_id,  # subject id
-                                  lambda line: line[PHENOTYPESDATACOLS.PHENOTYPE_ID.value],  # object id
+                                  lambda line: line[PHENOTYPE_ID],  # object id
                                   lambda line: self.has_phenotype_predicate,  # predicate extractor
                                   lambda line: {},  # subject props
                                   lambda line: {},  # object props
-                                  lambda line: {'notes': line[PHENOTYPESDATACOLS.PHENOTYPE_NOTE.value],
+                                  lambda line: {'notes': line[PHENOTYPE_NOTE],
                                                 PRIMARY_KNOWLEDGE_SOURCE: self.provenance_id},#edgeprops
                                   comment_character=None,
                                   delim=',',
@@ -197,42 +258,15 @@ class Cord19Loader(SourceDataLoader):
         trials_file: str = os.path.join(self.data_path, self.drug_bank_trials_file_name)
         with open(trials_file, 'r') as fp:
             extractor.csv_extract(fp,
-                                  lambda line: line[TRIALSDATACOLS.DRUG_ID.value],  # subject id
-                                  lambda line: line[TRIALSDATACOLS.TARGET_ID.value],  # object id
-                                  lambda line: f'ROBOKOVID:{line[TRIALSDATACOLS.PREDICATE.value]}', # predicate extractor
+                                  lambda line: line[TRIALS_DRUG_ID],  # subject id
+                                  lambda line: line[TRIALS_TARGET_ID],  # object id
+                                  lambda line: f'ROBOKOVID:{line[TRIALS_PREDICATE]}', # predicate extractor
                                   lambda line: {},  # subject props
                                   lambda line: {},  # object props
-                                  lambda line: {'count': line[TRIALSDATACOLS.COUNT.value],
+                                  lambda line: {'count': line[TRIALS_COUNT],
                                                 PRIMARY_KNOWLEDGE_SOURCE: 'infores:drugbank'},#edgeprops
                                   comment_character=None,
                                   delim='\t',
                                   has_header_row=True)
 
-        self.final_node_list = extractor.nodes
-        self.final_edge_list = extractor.edges
-
-        # we want to duplicate all the edges attached to the nodes for covid as a disease and SARS-CoV-2 as a taxon
-        # right now this is:
-        covid_disease_id = 'MONDO:0100096'
-        coronavirus_taxon_id = 'NCBITaxon:2697049'
-        edges_to_add = []
-        for edge in self.final_edge_list:
-            new_edge = None
-            if edge.subjectid == covid_disease_id:
-                new_edge = deepcopy(edge)
-                new_edge.subjectid = coronavirus_taxon_id
-            elif edge.objectid == covid_disease_id:
-                new_edge = deepcopy(edge)
-                new_edge.objectid = coronavirus_taxon_id
-            elif edge.subjectid == coronavirus_taxon_id:
-                new_edge = deepcopy(edge)
-                new_edge.subjectid = covid_disease_id
-            elif edge.objectid == coronavirus_taxon_id:
-                new_edge = deepcopy(edge)
-                new_edge.objectid = covid_disease_id
-
-            if new_edge and new_edge.subjectid != new_edge.objectid:
-                edges_to_add.append(new_edge)
-        self.final_edge_list.extend(edges_to_add)
-
         return extractor.load_metadata